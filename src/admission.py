@@ -0,0 +1,147 @@
+import asyncio
+import json
+from starlette.routing import Match
+from src.config import settings
+
+
+class Saturated(Exception):
+    pass
+
+
+class RouteLimiter:
+    """
+    Bounded concurrency limiter with a bounded wait queue for a group of routes.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, timeout: float):
+        # Fail fast when every slot is taken and the wait queue is full
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Saturated()
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Saturated()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+limiters = {
+    "read": RouteLimiter(
+        "read", settings.admission_read_concurrency, settings.admission_read_queue
+    ),
+    "list": RouteLimiter(
+        "list", settings.admission_list_concurrency, settings.admission_list_queue
+    ),
+    "write": RouteLimiter(
+        "write", settings.admission_write_concurrency, settings.admission_write_queue
+    ),
+}
+
+
+def admission_group(group: str):
+    """
+    Decorator assigning an endpoint to a route group, e.g. `list` for GET endpoints
+    returning whole collections, which are limited separately from cheap reads.
+    """
+
+    def decorator(endpoint):
+        endpoint.admission_group = group
+        return endpoint
+
+    return decorator
+
+
+def classify(routes, method: str, path: str) -> str | None:
+    # Only API routes are limited, so `/`, docs and metrics stay responsive
+    if not path.startswith("/api/"):
+        return None
+    if method not in ("GET", "HEAD"):
+        return "write"
+    # Load is shed before routing, so the endpoint is looked up here
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route.endpoint, "admission_group", "read")
+    return "read"
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds load with a 503 once a route group is saturated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        group = classify(scope["app"].routes, scope["method"], scope["path"])
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        limiter = limiters[group]
+        try:
+            await limiter.acquire(settings.admission_queue_timeout)
+        except Saturated:
+            return await self.reject(send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def reject(self, send):
+        body = json.dumps({"detail": "Service is overloaded, try again later!"})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(settings.admission_retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body.encode()})
@@ -0,0 +1,12 @@
+from redis import asyncio as aioredis
+from src.config import settings
+from src.pools import MonitoredBlockingConnectionPool
+
+pool = MonitoredBlockingConnectionPool.from_url(
+    settings.redis_url,
+    max_connections=settings.redis_max_connections,
+    timeout=settings.redis_pool_timeout,
+    socket_timeout=settings.redis_socket_timeout,
+    socket_connect_timeout=settings.redis_socket_connect_timeout,
+)
+redis = aioredis.Redis(connection_pool=pool)
@@ -10,6 +10,50 @@ class Settings(BaseSettings):
     database_url: str
     mongo_initdb_database: str
 
+    # Mongo connection pool, per uvicorn worker
+    database_max_pool_size: int = 100
+    database_min_pool_size: int = 0
+    database_max_connecting: int = 2
+    database_max_idle_time_ms: int | None = None
+    # Wait for a free connection, without it exhaustion is never reported
+    database_wait_queue_timeout_ms: int | None = None
+    database_connect_timeout_ms: int = 20000
+    database_server_selection_timeout_ms: int = 30000
+
+    # Redis connection pool, per uvicorn worker
+    redis_url: str = "redis://redis:6379"
+    redis_max_connections: int = 50
+    redis_pool_timeout: float | None = 20  # Wait for a free connection
+    redis_socket_timeout: float | None = None
+    redis_socket_connect_timeout: float | None = None
+
+    # Read routing, GET endpoints read from secondaries when enabled
+    database_read_from_secondaries: bool = True
+    database_max_staleness_seconds: int = 90  # MongoDB requires at least 90 seconds
+
+    # Profiling, a request is profiled when it sends the profiling token in the
+    # profiling header or is sampled
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_header: str = "X-Profile"
+    profiling_token: str | None = None  # Profiling on request is off without a token
+    profiling_output_dir: str = "profiles"  # Chrome trace event JSON files
+    profiling_max_files: int = 1000  # Oldest profiles are deleted past this count
+
+    # Token required by the `/metrics` endpoints, sent as the `X-Metrics-Token` header
+    metrics_token: str | None = None
+
+    # Admission control, limits are per uvicorn worker
+    admission_control_enabled: bool = True
+    admission_queue_timeout: float = 1.0  # Seconds a request may wait for a slot
+    admission_retry_after: int = 1  # Seconds advertised in the `Retry-After` header
+    admission_read_concurrency: int = 64
+    admission_read_queue: int = 128
+    admission_list_concurrency: int = 16
+    admission_list_queue: int = 32
+    admission_write_concurrency: int = 16
+    admission_write_queue: int = 32
+
     class Config:
         env_file = ENV_FILE_PATH
         env_file_encoding = "utf-8"
@@ -1,16 +1,76 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextvars import ContextVar
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
 from src.config import settings
+from src.pools import MongoPoolListener
+from src.profiling import ProfilingCommandListener
 from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import SecondaryPreferred
 
-client = AsyncIOMotorClient(settings.database_url)
+pool_listener = MongoPoolListener()
+event_listeners = [pool_listener]
+if settings.profiling_enabled:
+    event_listeners.append(ProfilingCommandListener())
+
+client = AsyncIOMotorClient(
+    settings.database_url,
+    maxPoolSize=settings.database_max_pool_size,
+    minPoolSize=settings.database_min_pool_size,
+    maxConnecting=settings.database_max_connecting,
+    maxIdleTimeMS=settings.database_max_idle_time_ms,
+    waitQueueTimeoutMS=settings.database_wait_queue_timeout_ms,
+    connectTimeoutMS=settings.database_connect_timeout_ms,
+    serverSelectionTimeoutMS=settings.database_server_selection_timeout_ms,
+    event_listeners=event_listeners,
+)
 db = client[settings.mongo_initdb_database]
 
+# Database handle for GET endpoints, reading from secondaries within a staleness bound
+if settings.database_read_from_secondaries:
+    read_db = client.get_database(
+        settings.mongo_initdb_database,
+        read_preference=SecondaryPreferred(
+            max_staleness=settings.database_max_staleness_seconds
+        ),
+    )
+else:
+    read_db = db
+
 # Collections
 Employee = db.employees
 Vehicle = db.vehicles
 Allocation = db.allocations
 AllocationLog = db.allocation_logs
 
+# Read-only collections
+ReadEmployee = read_db.employees
+ReadVehicle = read_db.vehicles
+ReadAllocation = read_db.allocations
+ReadAllocationLog = read_db.allocation_logs
+
+# Causally consistent session of the current request, set by `CausalSessionMiddleware`
+session_context: ContextVar[AsyncIOMotorClientSession | None] = ContextVar(
+    "session_context", default=None
+)
+
+
+def get_session() -> AsyncIOMotorClientSession | None:
+    return session_context.get()
+
+
+# Multi-document transactions need a replica set or sharded cluster, detected at startup
+transactions_supported = False
+
+
+async def detect_transactions():
+    global transactions_supported
+    hello = await client.admin.command("hello")
+    transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def supports_transactions() -> bool:
+    return transactions_supported
+
 
 # Indexes are created asynchronously
 async def create_indexes():
@@ -19,4 +79,22 @@ async def create_indexes():
         [("registration_number", ASCENDING), ("driver_license_number", ASCENDING)],
         unique=True,
     )
+    try:
+        await create_allocation_indexes()
+    except OperationFailure as e:
+        # Allocations from before the indexes can break them, the app keeps running
+        # on the conflict checks until `python -m src.migrations` has been run
+        print(f"Allocation indexes not created, run `python -m src.migrations`: {e}")
     await AllocationLog.create_index([("allocation_date", ASCENDING)])
+
+
+async def create_allocation_indexes():
+    # A vehicle or an employee can only be allocated once per allocation date,
+    # enforced by the database so concurrent requests cannot double-book.
+    # Allocations without a vehicle or an employee are left out.
+    for field in ("vehicle_id", "employee_id"):
+        await Allocation.create_index(
+            [(field, ASCENDING), ("allocation_date", ASCENDING)],
+            unique=True,
+            partialFilterExpression={field: {"$type": "string"}},
+        )
@@ -1,19 +1,29 @@
-from fastapi import FastAPI
+import secrets
+from fastapi import Depends, FastAPI, Header, HTTPException
 from contextlib import asynccontextmanager
-from src.database import create_indexes
+from src.admission import AdmissionControlMiddleware, admission_stats
+from src.cache import pool, redis
+from src.config import settings
+from src.database import client, create_indexes, detect_transactions, pool_listener
 from src.routers import allocation, employee, vehicle
+from src.profiling import ProfiledJsonCoder, ProfilingMiddleware
+from src.sessions import CausalSessionMiddleware
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code
     await create_indexes()  # Create indexes when app starts
-    redis = aioredis.from_url("redis://redis:6379")
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    await detect_transactions()
+    FastAPICache.init(
+        RedisBackend(redis), prefix="fastapi-cache", coder=ProfiledJsonCoder
+    )
     yield
+    # Shutdown code
+    client.close()
+    await redis.aclose(close_connection_pool=True)
 
 
 app = FastAPI(
@@ -23,12 +33,54 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Middleware added last runs first, so load is shed before a session is started
+app.add_middleware(CausalSessionMiddleware)
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=settings.profiling_sample_rate,
+        header=settings.profiling_header,
+        token=settings.profiling_token,
+        output_dir=settings.profiling_output_dir,
+        max_files=settings.profiling_max_files,
+    )
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionControlMiddleware)
+
 
 @app.get("/")
 def root():
     return {"message": "Vehicle Allocation System"}
 
 
+def verify_metrics_token(x_metrics_token: str | None = Header(None)):
+    # Metrics are open when no token is configured, e.g. in local development
+    if settings.metrics_token is None:
+        return
+    if x_metrics_token is None or not secrets.compare_digest(
+        x_metrics_token, settings.metrics_token
+    ):
+        raise HTTPException(status_code=403, detail="Invalid metrics token!")
+
+
+@app.get(
+    "/metrics/admission",
+    tags=["Metrics"],
+    dependencies=[Depends(verify_metrics_token)],
+)
+def read_admission_metrics():
+    return admission_stats()
+
+
+@app.get(
+    "/metrics/pools",
+    tags=["Metrics"],
+    dependencies=[Depends(verify_metrics_token)],
+)
+def read_pool_metrics():
+    return {"mongo": pool_listener.stats(), "redis": pool.stats()}
+
+
 app.include_router(allocation.router, tags=["Allocation"], prefix="/api")
 app.include_router(employee.router, tags=["Employee"], prefix="/api")
 app.include_router(vehicle.router, tags=["Vehicle"], prefix="/api")
@@ -0,0 +1,60 @@
+import asyncio
+from typing import List
+from src.database import Allocation, create_allocation_indexes
+
+# Start of the day of an allocation, in UTC like the stored dates
+ALLOCATION_DAY = {"$dateTrunc": {"date": "$allocation_date", "unit": "day"}}
+
+
+async def normalise_allocation_dates() -> int:
+    # Allocations used to be stored at any time of their day
+    result = await Allocation.update_many(
+        {"$expr": {"$ne": ["$allocation_date", ALLOCATION_DAY]}},
+        [{"$set": {"allocation_date": ALLOCATION_DAY}}],
+    )
+    return result.modified_count
+
+
+async def find_duplicate_allocations(field: str) -> List[dict]:
+    # Days on which a vehicle or an employee has more than one allocation
+    return await Allocation.aggregate(
+        [
+            {"$match": {field: {"$type": "string"}}},
+            {
+                "$group": {
+                    "_id": {field: f"${field}", "allocation_date": "$allocation_date"},
+                    "allocation_ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"_id.allocation_date": 1}},
+        ]
+    ).to_list(length=None)
+
+
+async def migrate_allocations():
+    # Prepare the allocations for the unique per-day indexes and create them
+    normalised = await normalise_allocation_dates()
+    print(f"Moved {normalised} allocations to midnight of their day")
+
+    duplicates = []
+    for field in ("vehicle_id", "employee_id"):
+        duplicates += await find_duplicate_allocations(field)
+    if duplicates:
+        # Double bookings cannot be resolved automatically
+        for duplicate in duplicates:
+            allocation_ids = ", ".join(map(str, duplicate["allocation_ids"]))
+            print(f"Duplicate allocations for {duplicate['_id']}: {allocation_ids}")
+        print(
+            f"Found {len(duplicates)} double bookings, delete or move all but one "
+            "allocation of each and run the migration again"
+        )
+        return
+
+    await create_allocation_indexes()
+    print("Created the unique allocation indexes")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_allocations())
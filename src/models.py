@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel, EmailStr
 
 
@@ -32,6 +33,18 @@ class AllocationModel(BaseModel):
     allocation_date: datetime
 
 
+class AllocationRangeModel(BaseModel):
+    """
+    Model for allocating a vehicle over a date range, optionally following a recurrence rule.
+    """
+
+    employee_id: str | None
+    vehicle_id: str | None
+    start_date: datetime
+    end_date: datetime
+    recurrence: Literal["daily", "weekdays", "weekly"] = "daily"
+
+
 class AllocationLogModel(BaseModel):
     """
     Model for a single allocation log record.
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+import weakref
+from pymongo import monitoring
+from pymongo.monitoring import ConnectionCheckOutFailedReason
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+
+class PoolStats:
+    """
+    Counters of connection checkouts, wait times and exhaustion for a pool.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.exhausted = 0  # Checkouts that timed out waiting for a free connection
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_cleared = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()  # Mongo events arrive from Motor's threads
+
+    def count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def checked_out(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def checkout_failed(self, exhausted: bool):
+        with self._lock:
+            self.checkout_failures += 1
+            if exhausted:
+                self.exhausted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "exhausted": self.exhausted,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "pool_cleared": self.pool_cleared,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "avg_wait_ms": (
+                    self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0
+                ),
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Records checkouts, wait times and exhaustion of the Mongo connection pools.
+    """
+
+    def __init__(self):
+        self.pool = PoolStats()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool.count("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.pool.count("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.pool.count("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.pool.checkout_failed(
+            event.reason == ConnectionCheckOutFailedReason.TIMEOUT
+        )
+
+    def connection_checked_out(self, event):
+        self.pool.checked_out(event.duration or 0.0)
+
+    def connection_checked_in(self, event):
+        self.pool.checked_in()
+
+    def stats(self) -> dict:
+        return self.pool.stats()
+
+
+class MonitoredConnection:
+    """
+    Mixin counting the sockets a Redis connection opens and closes.
+    """
+
+    pool_stats: PoolStats
+
+    async def _connect(self):
+        await super()._connect()
+        self.pool_stats.count("connections_created")
+
+    async def disconnect(self, nowait: bool = False):
+        connected = self.is_connected
+        try:
+            await super().disconnect(nowait=nowait)
+        finally:
+            if connected:
+                self.pool_stats.count("connections_closed")
+
+
+class MonitoredBlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """
+    Redis connection pool that waits for a free connection and records its stats.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = PoolStats()
+        self._checked_out = weakref.WeakSet()
+        # Connections reconnect on their own, so they are counted by the connection
+        self.connection_class = type(
+            self.connection_class.__name__,
+            (MonitoredConnection, self.connection_class),
+            {"pool_stats": self.pool},
+        )
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except RedisError as err:
+            # Either the pool is full, or the connection failed or timed out
+            self.pool.checkout_failed(isinstance(err.__cause__, asyncio.TimeoutError))
+            raise
+        self.pool.checked_out(time.perf_counter() - started)
+        self._checked_out.add(connection)
+        return connection
+
+    async def release(self, connection):
+        # Connections that failed to connect are released without being checked out
+        if connection in self._checked_out:
+            self._checked_out.discard(connection)
+            self.pool.checked_in()
+        await super().release(connection)
+
+    def stats(self) -> dict:
+        return {
+            **self.pool.stats(),
+            "max_connections": self.max_connections,
+            "idle": len(self._available_connections),
+        }
@@ -0,0 +1,256 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+from fastapi_cache.coder import JsonCoder
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+
+
+class RequestProfile:
+    """
+    Wall time of a single request, split into phases and recorded as trace events.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.finished = None
+        self.totals = defaultdict(float)
+        self.events = []
+        self.endpoint_started = None
+        self.endpoint_finished = None
+        self._lock = threading.Lock()  # DB events are recorded from Motor's threads
+
+    def record(self, phase: str, name: str, start: float, end: float):
+        with self._lock:
+            self.totals[phase] += end - start
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": phase,
+                    "ph": "X",
+                    "ts": (start - self.started) * 1_000_000,
+                    "dur": (end - start) * 1_000_000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+            )
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        self.record("total", self.name, self.started, self.finished)
+
+    def server_timing(self) -> str:
+        # Durations in milliseconds, as expected by the `Server-Timing` header
+        return ", ".join(
+            f"{phase};dur={duration * 1000:.2f}"
+            for phase, duration in self.totals.items()
+        )
+
+    def to_trace(self) -> dict:
+        # Chrome trace event format, readable by Perfetto, chrome://tracing and speedscope
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+
+# Profile of the current request, set by `ProfilingMiddleware` for sampled requests
+profile_context: ContextVar[RequestProfile | None] = ContextVar(
+    "profile_context", default=None
+)
+
+
+@contextmanager
+def profile_phase(phase: str, name: str | None = None):
+    profile = profile_context.get()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(phase, name or phase, start, time.perf_counter())
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    """
+    Records the duration of Mongo commands against the profile of the current request.
+
+    Motor copies the context into its executor threads, so the request profile is
+    visible here.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        profile = profile_context.get()
+        if profile is not None:
+            end = time.perf_counter()
+            profile.record(
+                "db", event.command_name, end - event.duration_micros / 1_000_000, end
+            )
+
+
+class ProfiledJsonCoder(JsonCoder):
+    """
+    Cache coder timing the encoding and decoding of cached responses.
+    """
+
+    @classmethod
+    def encode(cls, value):
+        with profile_phase("cache", "encode"):
+            return super().encode(value)
+
+    @classmethod
+    def decode(cls, value):
+        with profile_phase("cache", "decode"):
+            return super().decode(value)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route splitting profiled requests into request validation, the endpoint and
+    response serialization.
+    """
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+
+            @functools.wraps(endpoint)
+            async def profiled_endpoint(*args, **kwargs):
+                profile = profile_context.get()
+                if profile is not None:
+                    profile.endpoint_started = time.perf_counter()
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    if profile is not None:
+                        profile.endpoint_finished = time.perf_counter()
+
+            self.dependant.call = profiled_endpoint
+
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            profile = profile_context.get()
+            if profile is None:
+                return await handler(request)
+
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                end = time.perf_counter()
+                if profile.endpoint_started is None:
+                    # The request was rejected before reaching the endpoint
+                    profile.record("validation", "request", start, end)
+                else:
+                    profile.record(
+                        "validation", "request", start, profile.endpoint_started
+                    )
+                    profile.record(
+                        "endpoint",
+                        self.name,
+                        profile.endpoint_started,
+                        profile.endpoint_finished or end,
+                    )
+                    if profile.endpoint_finished is not None:
+                        profile.record(
+                            "serialization", "response", profile.endpoint_finished, end
+                        )
+
+        return profiled_handler
+
+
+def write_profile(output_dir: str, profile: RequestProfile, max_files: int):
+    os.makedirs(output_dir, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", profile.name).strip("_")
+    path = os.path.join(
+        output_dir, f"{int(time.time() * 1000)}-{name}-{uuid.uuid4().hex[:8]}.json"
+    )
+    with open(path, "w") as file:
+        json.dump(profile.to_trace(), file)
+    prune_profiles(output_dir, max_files)
+
+
+def prune_profiles(output_dir: str, max_files: int):
+    # File names start with the time in milliseconds, so they sort oldest first
+    profiles = sorted(name for name in os.listdir(output_dir) if name.endswith(".json"))
+    for name in profiles[: max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except FileNotFoundError:
+            pass  # Already pruned by another worker
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that send the profiling token in a header,
+    or a random sample of them.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float,
+        header: str,
+        token: str | None,
+        output_dir: str,
+        max_files: int,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.header = header
+        self.token = token
+        self.output_dir = output_dir
+        self.max_files = max_files
+
+    def should_profile(self, scope) -> bool:
+        # Profiles are written to disk, so only holders of the token may ask for one
+        value = Headers(scope=scope).get(self.header)
+        if self.token and value and secrets.compare_digest(value, self.token):
+            return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(f"{scope['method']} {scope['path']}")
+
+        async def send_with_server_timing(message):
+            if message["type"] == "http.response.start":
+                profile.finish()
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        token = profile_context.set(profile)
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            profile_context.reset(token)
+            if profile.finished is None:
+                profile.finish()
+            await asyncio.to_thread(
+                write_profile, self.output_dir, profile, self.max_files
+            )
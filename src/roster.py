@@ -0,0 +1,249 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import List
+from bson import ObjectId
+from src.cache import redis
+from src.database import (
+    Allocation,
+    Employee,
+    Vehicle,
+    ReadAllocation,
+    ReadEmployee,
+    ReadVehicle,
+    get_session,
+)
+from src.schemas import AllocationRead, MinimumEmployeeRead, MinimumVehicleRead
+
+# Each day is a Redis hash of allocation ID to the allocation with its details nested
+ROSTER_KEY_PREFIX = "roster"
+ROSTER_DAY_PATTERN = f"{ROSTER_KEY_PREFIX}:????-??-??"
+
+# Hash of allocation ID to `<version>|<day key>` of its roster entry, or to
+# `deleted|<day key>` once it has been deleted
+ROSTER_INDEX_KEY = f"{ROSTER_KEY_PREFIX}:index"
+
+# Index entries of days this far in the past are pruned when the roster is rebuilt
+ROSTER_INDEX_RETENTION_DAYS = 7
+
+# Set once the roster has been built, until then reads fall back to Mongo
+ROSTER_BUILT_KEY = f"{ROSTER_KEY_PREFIX}:built"
+
+# Writes an allocation to the roster of its day and removes it from its previous
+# day, unless the roster already holds a newer version or it has been deleted.
+# KEYS: index, day, previous day. ARGV: allocation ID, version, entry.
+# The day of the indexed entry is read from the index, so Redis must not be a cluster.
+UPSERT_SCRIPT = redis.register_script("""
+local current = redis.call("HGET", KEYS[1], ARGV[1])
+if current and string.sub(current, 1, 8) == "deleted|" then
+    return 0
+end
+if current then
+    local separator = string.find(current, "|", 1, true)
+    if tonumber(string.sub(current, 1, separator - 1)) > tonumber(ARGV[2]) then
+        return 0
+    end
+    local day = string.sub(current, separator + 1)
+    if day ~= KEYS[2] then
+        redis.call("HDEL", day, ARGV[1])
+    end
+end
+if KEYS[3] ~= KEYS[2] then
+    redis.call("HDEL", KEYS[3], ARGV[1])
+end
+redis.call("HSET", KEYS[2], ARGV[1], ARGV[3])
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2] .. "|" .. KEYS[2])
+return 1
+""")
+
+# Removes an allocation from the roster and marks it deleted, so that a delayed
+# write of an older version cannot bring it back.
+# KEYS: index, day. ARGV: allocation ID.
+REMOVE_SCRIPT = redis.register_script("""
+local current = redis.call("HGET", KEYS[1], ARGV[1])
+if current and string.sub(current, 1, 8) ~= "deleted|" then
+    local separator = string.find(current, "|", 1, true)
+    redis.call("HDEL", string.sub(current, separator + 1), ARGV[1])
+end
+redis.call("HDEL", KEYS[2], ARGV[1])
+redis.call("HSET", KEYS[1], ARGV[1], "deleted|" .. KEYS[2])
+return 1
+""")
+
+# Removes index entries whose day is before a cutoff day key, checked again here as
+# they may have moved to another day since they were scanned.
+# KEYS: index. ARGV: cutoff day key, allocation IDs.
+PRUNE_SCRIPT = redis.register_script("""
+local pruned = 0
+for i = 2, #ARGV do
+    local current = redis.call("HGET", KEYS[1], ARGV[i])
+    if current then
+        local day = string.sub(current, string.find(current, "|", 1, true) + 1)
+        if day < ARGV[1] then
+            redis.call("HDEL", KEYS[1], ARGV[i])
+            pruned = pruned + 1
+        end
+    end
+end
+return pruned
+""")
+
+
+def roster_key(allocation_date: date | datetime) -> str:
+    if isinstance(allocation_date, datetime):
+        allocation_date = allocation_date.date()
+    return f"{ROSTER_KEY_PREFIX}:{allocation_date.isoformat()}"
+
+
+async def upsert_in_roster(
+    client, allocation: AllocationRead, previous_key: str | None = None
+):
+    key = roster_key(allocation.allocation_date)
+    await UPSERT_SCRIPT(
+        keys=[ROSTER_INDEX_KEY, key, previous_key or key],
+        args=[
+            allocation.id,
+            allocation.version,
+            allocation.model_dump_json(by_alias=True),
+        ],
+        client=client,
+    )
+
+
+async def add_to_roster(allocations: List[AllocationRead]):
+    async with redis.pipeline(transaction=False) as pipe:
+        for allocation in allocations:
+            await upsert_in_roster(pipe, allocation)
+        await pipe.execute()
+
+
+async def move_in_roster(previous_date: datetime, allocation: AllocationRead):
+    await upsert_in_roster(redis, allocation, roster_key(previous_date))
+
+
+async def remove_from_roster(allocation_id: str, allocation_date: datetime):
+    await REMOVE_SCRIPT(
+        keys=[ROSTER_INDEX_KEY, roster_key(allocation_date)], args=[allocation_id]
+    )
+
+
+async def read_roster(allocation_date: date) -> List[AllocationRead] | None:
+    # None when the roster has not been built, e.g. on a new or flushed Redis
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.exists(ROSTER_BUILT_KEY)
+        pipe.hvals(roster_key(allocation_date))
+        built, entries = await pipe.execute()
+    if not built:
+        return None
+    allocations = [AllocationRead.model_validate_json(entry) for entry in entries]
+    return sorted(allocations, key=lambda allocation: allocation.allocation_date)
+
+
+async def find_details(collection, ids: set, projection: dict) -> dict:
+    object_ids = [
+        ObjectId(value) for value in ids if value and ObjectId.is_valid(value)
+    ]
+    documents = await collection.find({"_id": {"$in": object_ids}}, projection).to_list(
+        length=None
+    )
+    return {str(document["_id"]): document for document in documents}
+
+
+async def roster_entries(
+    allocations: List[dict], employee_collection=Employee, vehicle_collection=Vehicle
+) -> List[AllocationRead]:
+    # Nest the Employee and Vehicle details into the allocations
+    employees, vehicles = await asyncio.gather(
+        find_details(
+            employee_collection,
+            {allocation["employee_id"] for allocation in allocations},
+            {"name": 1, "email": 1},
+        ),
+        find_details(
+            vehicle_collection,
+            {allocation["vehicle_id"] for allocation in allocations},
+            {"name": 1, "driver_name": 1},
+        ),
+    )
+
+    entries = []
+    for allocation in allocations:
+        employee = employees.get(allocation["employee_id"])
+        vehicle = vehicles.get(allocation["vehicle_id"])
+        entries.append(
+            AllocationRead(
+                _id=str(allocation["_id"]),
+                employee=MinimumEmployeeRead(**employee) if employee else None,
+                vehicle=MinimumVehicleRead(**vehicle) if vehicle else None,
+                allocation_date=allocation["allocation_date"],
+                version=allocation.get("version", 0),
+                created_at=allocation.get("created_at"),
+                updated_at=allocation.get("updated_at"),
+            )
+        )
+    return entries
+
+
+async def read_roster_from_database(allocation_date: date) -> List[AllocationRead]:
+    day = datetime.combine(allocation_date, time())
+    allocations = await ReadAllocation.find(
+        {"allocation_date": {"$gte": day, "$lt": day + timedelta(days=1)}},
+        session=get_session(),
+    ).to_list(length=None)
+    entries = await roster_entries(allocations, ReadEmployee, ReadVehicle)
+    return sorted(entries, key=lambda allocation: allocation.allocation_date)
+
+
+async def rebuild_roster():
+    # Entries in the roster before the snapshot that are missing from it have been
+    # deleted since, while entries written after it are at least as new as it
+    previous_keys = {}
+    async for key in redis.scan_iter(match=ROSTER_DAY_PATTERN):
+        for allocation_id in await redis.hkeys(key):
+            previous_keys[allocation_id.decode()] = key.decode()
+
+    # Regenerate every day of the roster from the allocations collection
+    allocations = await Allocation.find().to_list(length=None)
+    entries = await roster_entries(allocations)
+
+    # Entries are written one by one and only over older versions, so writes made
+    # by the API during the rebuild are kept
+    async with redis.pipeline(transaction=False) as pipe:
+        for entry in entries:
+            await upsert_in_roster(pipe, entry, previous_keys.pop(entry.id, None))
+        for allocation_id, key in previous_keys.items():
+            await REMOVE_SCRIPT(
+                keys=[ROSTER_INDEX_KEY, key], args=[allocation_id], client=pipe
+            )
+        pipe.set(ROSTER_BUILT_KEY, datetime.now().isoformat())
+        await pipe.execute()
+
+    pruned = await prune_roster_index()
+    days = {roster_key(entry.allocation_date) for entry in entries}
+    print(
+        f"Rebuilt roster of {len(entries)} allocations over {len(days)} days, "
+        f"removed {len(previous_keys)} deleted allocations, "
+        f"pruned {pruned} index entries"
+    )
+
+
+async def prune_roster_index(batch_size: int = 1000) -> int:
+    # Past days are no longer written by the API, so their version guards and
+    # tombstones can go and the index does not grow forever
+    cutoff = roster_key(date.today() - timedelta(days=ROSTER_INDEX_RETENTION_DAYS))
+    allocation_ids = [
+        allocation_id
+        async for allocation_id, entry in redis.hscan_iter(ROSTER_INDEX_KEY)
+        if entry.split(b"|", 1)[1].decode() < cutoff
+    ]
+
+    pruned = 0
+    for start in range(0, len(allocation_ids), batch_size):
+        pruned += await PRUNE_SCRIPT(
+            keys=[ROSTER_INDEX_KEY],
+            args=[cutoff, *allocation_ids[start : start + batch_size]],
+        )
+    return pruned
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_roster())
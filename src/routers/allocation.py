@@ -1,11 +1,35 @@
-from fastapi import HTTPException, APIRouter, status, Query
-from datetime import datetime
-from typing import List
+import asyncio
+from fastapi import HTTPException, APIRouter, status, Query, Header, Response
+from datetime import date, datetime, time, timedelta
+from typing import List, Union
 from bson import ObjectId
-from src.database import Allocation, AllocationLog, Employee, Vehicle
-from src.models import AllocationModel, AllocationLogModel
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from src.admission import admission_group
+from src.database import (
+    Allocation,
+    AllocationLog,
+    Employee,
+    Vehicle,
+    ReadAllocation,
+    ReadAllocationLog,
+    ReadEmployee,
+    ReadVehicle,
+    get_session,
+    supports_transactions,
+)
+from src.models import AllocationModel, AllocationLogModel, AllocationRangeModel
+from src.profiling import ProfiledRoute
+from src.roster import (
+    add_to_roster,
+    move_in_roster,
+    read_roster,
+    read_roster_from_database,
+    remove_from_roster,
+)
 from src.schemas import (
     ErrorResponseMessage,
+    AllocationConflictResponse,
     AllocationRead,
     AllocationLogRead,
     MinimumEmployeeRead,
@@ -13,37 +37,160 @@ from src.schemas import (
 )
 from fastapi_cache.decorator import cache
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Upper bound on the number of days a single range allocation may expand to
+MAX_RANGE_ALLOCATION_DAYS = 366
+
+# Employee and Vehicle fields nested into allocation responses
+EMPLOYEE_PROJECTION = {"name": 1, "email": 1}
+VEHICLE_PROJECTION = {"name": 1, "driver_name": 1}
 
 
-async def get_allocation_by_id(allocation_id: str):
+async def get_allocation_by_id(allocation_id: str, collection=Allocation):
     # Check if the allocation exists
-    allocation = await Allocation.find_one({"_id": ObjectId(allocation_id)})
+    allocation = await collection.find_one(
+        {"_id": ObjectId(allocation_id)}, session=get_session()
+    )
     if allocation:
         return allocation
     else:
         raise HTTPException(status_code=404, detail="Allocation not found!")
 
 
+async def find_by_id(collection, document_id: str | None, projection: dict):
+    # Missing or malformed IDs resolve to None instead of raising.
+    # Runs outside the request session, which cannot be shared by concurrent lookups.
+    if document_id is None or not ObjectId.is_valid(document_id):
+        return None
+    return await collection.find_one({"_id": ObjectId(document_id)}, projection)
+
+
+def ensure_employee_and_vehicle(employee: dict | None, vehicle: dict | None):
+    # Reject allocations referencing employees or vehicles that do not exist
+    if employee is None:
+        raise HTTPException(status_code=400, detail="Employee not found!")
+    if vehicle is None:
+        raise HTTPException(status_code=400, detail="Vehicle not found!")
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    # The ETag of an allocation is its quoted version number, e.g. `"3"`
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header!")
+
+
+def allocation_day(allocation_date: datetime) -> datetime:
+    # Allocations are per calendar day and stored at midnight, so the unique indexes
+    # allow a single allocation per vehicle and per employee on a day
+    return datetime.combine(allocation_date.date(), time.min)
+
+
+def allocation_day_query(allocation_date: datetime) -> dict:
+    # Also matches allocations stored at another time of the day before the migration
+    return {"$gte": allocation_date, "$lt": allocation_date + timedelta(days=1)}
+
+
+def expand_allocation_dates(allocation: AllocationRangeModel) -> List[datetime]:
+    # Expand the range into the days of its recurrence rule, each allocated at midnight.
+    # Only the calendar days of the range matter, so times and time zones are dropped.
+    step = (
+        timedelta(weeks=1) if allocation.recurrence == "weekly" else timedelta(days=1)
+    )
+    dates = []
+    current = allocation.start_date.date()
+    while current <= allocation.end_date.date():
+        if allocation.recurrence != "weekdays" or current.weekday() < 5:
+            dates.append(datetime.combine(current, time.min))
+        current += step
+    return dates
+
+
+def duplicate_conflicts(error: Union[BulkWriteError, DuplicateKeyError]) -> List[dict]:
+    # Per-day conflicts reported by the unique allocation indexes
+    if isinstance(error, BulkWriteError):
+        write_errors = error.details.get("writeErrors", [])
+    else:
+        write_errors = [error.details or {}]
+
+    conflicts = []
+    for write_error in write_errors:
+        key_value = write_error.get("keyValue") or {}
+        if "allocation_date" not in key_value:
+            continue
+        if "vehicle_id" in key_value:
+            reason = "Vehicle is already allocated for a day!"
+        else:
+            reason = "Employee can only allocate one vehicle per day!"
+        conflicts.append(
+            {
+                "allocation_date": key_value["allocation_date"].isoformat(),
+                "reason": reason,
+            }
+        )
+    return conflicts
+
+
+async def insert_allocation_batch(
+    allocation_dicts: List[dict], allocation_log_dicts: List[dict]
+):
+    session = get_session()
+    if session is not None and supports_transactions():
+        # Write the allocations and their logs atomically
+        async with session.start_transaction():
+            await Allocation.insert_many(allocation_dicts, session=session)
+            await AllocationLog.insert_many(allocation_log_dicts, session=session)
+        return
+
+    try:
+        await Allocation.insert_many(allocation_dicts, session=session)
+    except Exception:
+        # Without transactions, roll back any part of the batch that was written
+        try:
+            await Allocation.delete_many(
+                {"_id": {"$in": [item["_id"] for item in allocation_dicts]}},
+                session=session,
+            )
+        except Exception as e:
+            print(e)
+        raise
+    await AllocationLog.insert_many(allocation_log_dicts, session=session)
+
+
 # List view
 @router.get(
     "/allocations",
     response_model=List[AllocationRead],
 )
+@admission_group("list")
 @cache(expire=60)
 async def read_allocations(offset: int = 0, limit: int = 10):
-    allocations = await Allocation.find().skip(offset).limit(limit).to_list()
+    allocations = (
+        await ReadAllocation.find({}, session=get_session())
+        .skip(offset)
+        .limit(limit)
+        .to_list()
+    )
     allocation_list = []
 
     for allocation in allocations:
-        employee = await Employee.find_one({"_id": ObjectId(allocation["employee_id"])})
-        vehicle = await Vehicle.find_one({"_id": ObjectId(allocation["vehicle_id"])})
+        employee = await ReadEmployee.find_one(
+            {"_id": ObjectId(allocation["employee_id"])}, session=get_session()
+        )
+        vehicle = await ReadVehicle.find_one(
+            {"_id": ObjectId(allocation["vehicle_id"])}, session=get_session()
+        )
 
         allocation_data = AllocationRead(
             _id=str(allocation["_id"]),
             employee=MinimumEmployeeRead(**employee) if employee else None,
             vehicle=MinimumVehicleRead(**vehicle) if vehicle else None,
             allocation_date=allocation["allocation_date"],
+            version=allocation.get("version", 0),
             created_at=allocation["created_at"],
             updated_at=allocation["updated_at"],
         )
@@ -60,24 +207,46 @@ async def read_allocations(offset: int = 0, limit: int = 10):
         404: {"model": ErrorResponseMessage},
     },
 )
-@cache(expire=60)
-async def read_allocation(allocation_id: str):
+async def read_allocation(allocation_id: str, response: Response):
+    # Not cached and read from the primary, as the version returned as ETag must be
+    # current for `If-Match` updates. The details are only displayed, so they may lag.
     allocation = await get_allocation_by_id(allocation_id)
-    employee = await Employee.find_one({"_id": ObjectId(allocation["employee_id"])})
-    vehicle = await Vehicle.find_one({"_id": ObjectId(allocation["vehicle_id"])})
+    employee = await ReadEmployee.find_one(
+        {"_id": ObjectId(allocation["employee_id"])}, session=get_session()
+    )
+    vehicle = await ReadVehicle.find_one(
+        {"_id": ObjectId(allocation["vehicle_id"])}, session=get_session()
+    )
 
     allocation_data = AllocationRead(
         _id=str(allocation["_id"]),
         employee=MinimumEmployeeRead(**employee) if employee else None,
         vehicle=MinimumVehicleRead(**vehicle) if vehicle else None,
         allocation_date=allocation["allocation_date"],
+        version=allocation.get("version", 0),
         created_at=allocation.get("created_at"),
         updated_at=allocation.get("updated_at"),
     )
 
+    response.headers["ETag"] = f'"{allocation_data.version}"'
     return allocation_data
 
 
+# Roster view
+@router.get(
+    "/allocations/by-date/{allocation_date}",
+    response_model=List[AllocationRead],
+)
+@admission_group("list")
+async def read_allocations_by_date(allocation_date: date):
+    # Served from the per-day roster in a single Redis read
+    allocations = await read_roster(allocation_date)
+    if allocations is None:
+        # The roster has not been built yet, run `python -m src.roster`
+        allocations = await read_roster_from_database(allocation_date)
+    return allocations
+
+
 # Create view
 @router.post(
     "/allocations",
@@ -87,28 +256,31 @@ async def read_allocation(allocation_id: str):
         400: {"model": ErrorResponseMessage},
     },
 )
-async def allocate_vehicle(allocation: AllocationModel):
+async def allocate_vehicle(allocation: AllocationModel, response: Response):
     # Ensure allocation date is in the future
     if allocation.allocation_date.date() < datetime.now().date():
         raise HTTPException(
             status_code=400, detail="Allocation date must be in the future!"
         )
-
-    # Check if the vehicle is already allocated or if the employee has already allocated a vehicle for the same date
-    existing_allocation = await Allocation.find_one(
-        {
-            "$or": [
-                {
-                    "vehicle_id": allocation.vehicle_id,
-                    "allocation_date": allocation.allocation_date,
-                },
-                {
-                    "employee_id": allocation.employee_id,
-                    "allocation_date": allocation.allocation_date,
-                },
-            ]
-        }
+    allocation.allocation_date = allocation_day(allocation.allocation_date)
+
+    # Check if the vehicle is already allocated or if the employee has already allocated a vehicle for the same date,
+    # while fetching the Employee and Vehicle details concurrently
+    existing_allocation, employee, vehicle = await asyncio.gather(
+        Allocation.find_one(
+            {
+                "$or": [
+                    {"vehicle_id": allocation.vehicle_id},
+                    {"employee_id": allocation.employee_id},
+                ],
+                "allocation_date": allocation_day_query(allocation.allocation_date),
+            },
+            session=get_session(),
+        ),
+        find_by_id(Employee, allocation.employee_id, EMPLOYEE_PROJECTION),
+        find_by_id(Vehicle, allocation.vehicle_id, VEHICLE_PROJECTION),
     )
+    ensure_employee_and_vehicle(employee, vehicle)
 
     if existing_allocation:
         # Determine which condition was violated
@@ -123,26 +295,35 @@ async def allocate_vehicle(allocation: AllocationModel):
             )
 
     allocation_dict = allocation.model_dump()
+    allocation_dict["version"] = 1
     allocation_dict["created_at"] = datetime.now()
     allocation_dict["updated_at"] = None
 
     try:
         # Insert the new allocation into the database
-        result = await Allocation.insert_one(allocation_dict)
+        result = await Allocation.insert_one(allocation_dict, session=get_session())
         allocation_dict["_id"] = result.inserted_id
+    except DuplicateKeyError as e:
+        # Another request allocated the vehicle or the employee concurrently
+        conflicts = duplicate_conflicts(e)
+        if conflicts:
+            raise HTTPException(status_code=400, detail=conflicts[0]["reason"])
+        print(e)
+        raise HTTPException(status_code=400, detail="Error inserting allocation!")
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=400, detail="Error inserting allocation!")
 
-        # Fetch Employee and Vehicle details
-        employee = await Employee.find_one({"_id": ObjectId(allocation.employee_id)})
-        vehicle = await Vehicle.find_one({"_id": ObjectId(allocation.vehicle_id)})
+    # Nesting the details into the response
+    allocation_dict["employee"] = MinimumEmployeeRead(**employee)
+    allocation_dict["vehicle"] = MinimumVehicleRead(**vehicle)
 
-        # Nesting the details into the response
-        allocation_dict["employee"] = (
-            MinimumEmployeeRead(**employee) if employee else None
-        )
-        allocation_dict["vehicle"] = MinimumVehicleRead(**vehicle) if vehicle else None
+    try:
+        # Add the allocation to the roster of its day
+        await add_to_roster([AllocationRead(**allocation_dict)])
     except Exception as e:
+        # The roster can be regenerated with `python -m src.roster`
         print(e)
-        raise HTTPException(status_code=400, detail="Error inserting allocation!")
 
     # Record the action in allocation log
     log_entry = AllocationLogModel(
@@ -156,15 +337,172 @@ async def allocate_vehicle(allocation: AllocationModel):
     allocation_log_dict["created_at"] = datetime.now()
     try:
         # Insert the new allocation log into the database
-        result = await AllocationLog.insert_one(allocation_log_dict)
+        result = await AllocationLog.insert_one(
+            allocation_log_dict, session=get_session()
+        )
         allocation_log_dict["_id"] = result.inserted_id
     except Exception as e:
         print(e)
         raise HTTPException(status_code=400, detail="Error inserting allocation log!")
 
+    response.headers["ETag"] = f'"{allocation_dict["version"]}"'
     return allocation_dict
 
 
+# Range create view
+@router.post(
+    "/allocations/range",
+    response_model=List[AllocationRead],
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        400: {
+            "model": AllocationConflictResponse,
+            "description": "Per-day conflicts, or an error message",
+        },
+    },
+)
+async def allocate_vehicle_range(allocation: AllocationRangeModel):
+    # Ensure the range is well formed and starts in the future, comparing days only
+    start_day = allocation.start_date.date()
+    end_day = allocation.end_date.date()
+    if end_day < start_day:
+        raise HTTPException(
+            status_code=400, detail="End date must not be before start date!"
+        )
+    if start_day < datetime.now().date():
+        raise HTTPException(
+            status_code=400, detail="Allocation date must be in the future!"
+        )
+    if (end_day - start_day).days >= MAX_RANGE_ALLOCATION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Allocation range cannot exceed {MAX_RANGE_ALLOCATION_DAYS} days!",
+        )
+
+    allocation_dates = expand_allocation_dates(allocation)
+    if not allocation_dates:
+        raise HTTPException(
+            status_code=400, detail="Allocation range contains no allocation dates!"
+        )
+
+    # Check conflicts for every day of the range in a single query,
+    # while fetching the Employee and Vehicle details concurrently
+    existing_allocations, employee, vehicle = await asyncio.gather(
+        Allocation.find(
+            {
+                "$or": [
+                    {"vehicle_id": allocation.vehicle_id},
+                    {"employee_id": allocation.employee_id},
+                ],
+                "allocation_date": {
+                    "$gte": allocation_dates[0],
+                    "$lt": allocation_dates[-1] + timedelta(days=1),
+                },
+            },
+            {"vehicle_id": 1, "employee_id": 1, "allocation_date": 1},
+            session=get_session(),
+        ).to_list(length=None),
+        find_by_id(Employee, allocation.employee_id, EMPLOYEE_PROJECTION),
+        find_by_id(Vehicle, allocation.vehicle_id, VEHICLE_PROJECTION),
+    )
+    ensure_employee_and_vehicle(employee, vehicle)
+
+    # Allocations at any time of an allocated day conflict with it
+    allocation_days = {allocation_date.date() for allocation_date in allocation_dates}
+    existing_allocations = [
+        existing_allocation
+        for existing_allocation in existing_allocations
+        if existing_allocation["allocation_date"].date() in allocation_days
+    ]
+
+    if existing_allocations:
+        # Report which condition was violated for each conflicting day
+        conflicts = []
+        for existing_allocation in sorted(
+            existing_allocations, key=lambda item: item["allocation_date"]
+        ):
+            if existing_allocation["vehicle_id"] == allocation.vehicle_id:
+                reason = "Vehicle is already allocated for a day!"
+            else:
+                reason = "Employee can only allocate one vehicle per day!"
+            conflicts.append(
+                {
+                    "allocation_date": existing_allocation[
+                        "allocation_date"
+                    ].isoformat(),
+                    "reason": reason,
+                }
+            )
+        raise HTTPException(status_code=400, detail=conflicts)
+
+    created_at = datetime.now()
+    allocation_dicts = [
+        {
+            "_id": ObjectId(),
+            "employee_id": allocation.employee_id,
+            "vehicle_id": allocation.vehicle_id,
+            "allocation_date": allocation_date,
+            "version": 1,
+            "created_at": created_at,
+            "updated_at": None,
+        }
+        for allocation_date in allocation_dates
+    ]
+
+    # Record the actions in allocation log
+    allocation_log_dicts = []
+    for allocation_dict in allocation_dicts:
+        log_entry = AllocationLogModel(
+            allocation_id=str(allocation_dict["_id"]),
+            employee_id=allocation_dict["employee_id"],
+            vehicle_id=allocation_dict["vehicle_id"],
+            allocation_date=allocation_dict["allocation_date"],
+            action="created",
+        )
+        allocation_log_dict = log_entry.model_dump()
+        allocation_log_dict["created_at"] = created_at
+        allocation_log_dicts.append(allocation_log_dict)
+
+    try:
+        # Insert all allocations and their logs as one batch
+        await insert_allocation_batch(allocation_dicts, allocation_log_dicts)
+    except BulkWriteError as e:
+        # Another request allocated some of the days concurrently
+        conflicts = duplicate_conflicts(e)
+        if conflicts:
+            raise HTTPException(status_code=400, detail=conflicts)
+        print(e)
+        raise HTTPException(status_code=400, detail="Error inserting allocations!")
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=400, detail="Error inserting allocations!")
+
+    # Nesting the details into every allocation of the range
+    employee_data = MinimumEmployeeRead(**employee)
+    vehicle_data = MinimumVehicleRead(**vehicle)
+    allocation_list = [
+        AllocationRead(
+            _id=str(allocation_dict["_id"]),
+            employee=employee_data,
+            vehicle=vehicle_data,
+            allocation_date=allocation_dict["allocation_date"],
+            version=allocation_dict["version"],
+            created_at=allocation_dict["created_at"],
+            updated_at=allocation_dict["updated_at"],
+        )
+        for allocation_dict in allocation_dicts
+    ]
+
+    try:
+        # Add the allocations to the rosters of their days
+        await add_to_roster(allocation_list)
+    except Exception as e:
+        # The roster can be regenerated with `python -m src.roster`
+        print(e)
+
+    return allocation_list
+
+
 # Update view
 @router.put(
     "/allocations/{allocation_id}",
@@ -172,37 +510,44 @@ async def allocate_vehicle(allocation: AllocationModel):
     responses={
         400: {"model": ErrorResponseMessage},
         404: {"model": ErrorResponseMessage},
+        409: {"model": ErrorResponseMessage},
     },
 )
-async def update_allocation(allocation_id: str, allocation: AllocationModel):
-    # Check if the allocation exists
-    existing_allocation = await get_allocation_by_id(allocation_id)
+async def update_allocation(
+    allocation_id: str,
+    allocation: AllocationModel,
+    response: Response,
+    if_match: str | None = Header(None),
+):
+    expected_version = parse_if_match(if_match)
 
     # Ensure allocation date is in the future
     if allocation.allocation_date.date() < datetime.now().date():
         raise HTTPException(
             status_code=400, detail="Allocation date must be in the future!"
         )
-
-    # Check for conflicts with vehicle and employee
-    conflicting_allocation = await Allocation.find_one(
-        {
-            "$or": [
-                {
-                    "vehicle_id": allocation.vehicle_id,
-                    "allocation_date": allocation.allocation_date,
-                },
-                {
-                    "employee_id": allocation.employee_id,
-                    "allocation_date": allocation.allocation_date,
-                },
-            ],
-        }
+    allocation.allocation_date = allocation_day(allocation.allocation_date)
+
+    # Check for conflicts and fetch Employee and Vehicle details concurrently
+    conflicting_allocation, employee, vehicle = await asyncio.gather(
+        Allocation.find_one(
+            {
+                # The allocation being updated does not conflict with itself
+                "_id": {"$ne": ObjectId(allocation_id)},
+                "$or": [
+                    {"vehicle_id": allocation.vehicle_id},
+                    {"employee_id": allocation.employee_id},
+                ],
+                "allocation_date": allocation_day_query(allocation.allocation_date),
+            },
+            session=get_session(),
+        ),
+        find_by_id(Employee, allocation.employee_id, EMPLOYEE_PROJECTION),
+        find_by_id(Vehicle, allocation.vehicle_id, VEHICLE_PROJECTION),
     )
+    ensure_employee_and_vehicle(employee, vehicle)
 
-    if conflicting_allocation and conflicting_allocation["_id"] != ObjectId(
-        allocation_id
-    ):
+    if conflicting_allocation:
         # Determine which condition was violated
         if conflicting_allocation["vehicle_id"] == allocation.vehicle_id:
             raise HTTPException(
@@ -214,30 +559,61 @@ async def update_allocation(allocation_id: str, allocation: AllocationModel):
                 detail="Employee can only allocate one vehicle per day!",
             )
 
-    # Update allocation details
-    allocation_dict = allocation.model_dump()
-    allocation_dict["created_at"] = existing_allocation["created_at"]
-    allocation_dict["updated_at"] = datetime.now()
+    # Only update the version the client has seen, when it sent one
+    query = {"_id": ObjectId(allocation_id)}
+    if expected_version == 0:
+        query["version"] = {"$exists": False}
+    elif expected_version is not None:
+        query["version"] = expected_version
+
+    update = allocation.model_dump()
+    update["updated_at"] = datetime.now()
 
     try:
-        # Update the allocation in the database
-        await Allocation.update_one(
-            {"_id": ObjectId(allocation_id)}, {"$set": allocation_dict}
+        # Update the allocation and fetch the previous document in one round trip
+        previous_allocation = await Allocation.find_one_and_update(
+            query,
+            {"$set": update, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+            session=get_session(),
+        )
+    except DuplicateKeyError as e:
+        # Another request allocated the vehicle or the employee concurrently
+        conflicts = duplicate_conflicts(e)
+        if conflicts:
+            raise HTTPException(status_code=400, detail=conflicts[0]["reason"])
+        print(e)
+        raise HTTPException(status_code=400, detail="Error updating allocation!")
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=400, detail="Error updating allocation!")
+
+    if previous_allocation is None:
+        # Tell a missing allocation apart from a concurrent edit
+        await get_allocation_by_id(allocation_id)
+        raise HTTPException(
+            status_code=409, detail="Allocation was modified by another request!"
         )
-        allocation_dict["_id"] = allocation_id
 
-        # Fetch Employee and Vehicle details
-        employee = await Employee.find_one({"_id": ObjectId(allocation.employee_id)})
-        vehicle = await Vehicle.find_one({"_id": ObjectId(allocation.vehicle_id)})
+    # Apply the update to the previous document, which is kept for the roster
+    allocation_dict = {
+        **previous_allocation,
+        **update,
+        "version": previous_allocation.get("version", 0) + 1,
+    }
 
-        # Nesting the details into the response
-        allocation_dict["employee"] = (
-            MinimumEmployeeRead(**employee) if employee else None
+    # Nesting the details into the response
+    allocation_dict["employee"] = MinimumEmployeeRead(**employee)
+    allocation_dict["vehicle"] = MinimumVehicleRead(**vehicle)
+
+    try:
+        # Move the allocation to the roster of its new day
+        await move_in_roster(
+            previous_allocation["allocation_date"], AllocationRead(**allocation_dict)
         )
-        allocation_dict["vehicle"] = MinimumVehicleRead(**vehicle) if vehicle else None
     except Exception as e:
+        # The roster can be regenerated with `python -m src.roster`
         print(e)
-        raise HTTPException(status_code=400, detail="Error updating allocation!")
 
     # Record the action in allocation log
     log_entry = AllocationLogModel(
@@ -251,12 +627,15 @@ async def update_allocation(allocation_id: str, allocation: AllocationModel):
     allocation_log_dict["created_at"] = datetime.now()
     try:
         # Insert the new allocation log into the database
-        result = await AllocationLog.insert_one(allocation_log_dict)
+        result = await AllocationLog.insert_one(
+            allocation_log_dict, session=get_session()
+        )
         allocation_log_dict["_id"] = result.inserted_id
     except Exception as e:
         print(e)
         raise HTTPException(status_code=400, detail="Error inserting allocation log!")
 
+    response.headers["ETag"] = f'"{allocation_dict["version"]}"'
     return allocation_dict
 
 
@@ -289,13 +668,24 @@ async def delete_allocation(allocation_id: str):
     )
 
     # Proceed to delete the allocation
-    await Allocation.delete_one({"_id": ObjectId(allocation["_id"])})
+    await Allocation.delete_one(
+        {"_id": ObjectId(allocation["_id"])}, session=get_session()
+    )
+
+    try:
+        # Remove the allocation from the roster of its day
+        await remove_from_roster(str(allocation["_id"]), allocation["allocation_date"])
+    except Exception as e:
+        # The roster can be regenerated with `python -m src.roster`
+        print(e)
 
     allocation_log_dict = log_entry.model_dump()
     allocation_log_dict["created_at"] = datetime.now()
     try:
         # Insert the new allocation log into the database
-        result = await AllocationLog.insert_one(allocation_log_dict)
+        result = await AllocationLog.insert_one(
+            allocation_log_dict, session=get_session()
+        )
         allocation_log_dict["_id"] = result.inserted_id
     except Exception as e:
         print(e)
@@ -303,6 +693,7 @@ async def delete_allocation(allocation_id: str):
 
 
 @router.get("/allocation/logs", response_model=List[AllocationLogRead])
+@admission_group("list")
 @cache(expire=60)
 async def read_allocation_logs(
     employee_id: str = None,
@@ -324,7 +715,12 @@ async def read_allocation_logs(
         query["allocation_date"] = {"$gte": start_date, "$lte": end_date}
 
     # Fetch logs from the AllocationLog collection
-    logs = await AllocationLog.find(query).skip(offset).limit(limit).to_list()
+    logs = (
+        await ReadAllocationLog.find(query, session=get_session())
+        .skip(offset)
+        .limit(limit)
+        .to_list()
+    )
 
     allocation_logs = []
     for log in logs:
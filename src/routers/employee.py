@@ -2,19 +2,22 @@ from fastapi import HTTPException, APIRouter, status
 from datetime import datetime
 from typing import List
 from bson import ObjectId
-from src.database import Employee
+from src.admission import admission_group
+from src.database import Employee, ReadEmployee, get_session
 from src.models import EmployeeModel
+from src.profiling import ProfiledRoute
 from src.schemas import ErrorResponseMessage, EmployeeRead
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get(
     "/employees",
     response_model=List[EmployeeRead],
 )
+@admission_group("list")
 async def read_employees():
-    return await Employee.find().to_list(length=None)
+    return await ReadEmployee.find({}, session=get_session()).to_list(length=None)
 
 
 @router.get(
@@ -26,7 +29,9 @@ async def read_employees():
 )
 async def read_employee(employee_id: str):
     # Check the existing employee
-    employee = await Employee.find_one({"_id": ObjectId(employee_id)})
+    employee = await ReadEmployee.find_one(
+        {"_id": ObjectId(employee_id)}, session=get_session()
+    )
     if employee:
         return employee
     else:
@@ -43,7 +48,9 @@ async def read_employee(employee_id: str):
 )
 async def add_employee(employee: EmployeeModel):
     # Check if the email already exists
-    existing_employee = await Employee.find_one({"email": employee.email})
+    existing_employee = await Employee.find_one(
+        {"email": employee.email}, session=get_session()
+    )
     if existing_employee:
         raise HTTPException(status_code=400, detail="Email already exists!")
 
@@ -52,7 +59,7 @@ async def add_employee(employee: EmployeeModel):
     employee_dict["updated_at"] = None
 
     try:
-        result = await Employee.insert_one(employee_dict)
+        result = await Employee.insert_one(employee_dict, session=get_session())
         employee_dict["_id"] = result.inserted_id  # Capture the MongoDB _id
     except Exception as e:
         raise HTTPException(status_code=400, detail="Error inserting employee!")
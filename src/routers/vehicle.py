@@ -2,19 +2,22 @@ from fastapi import HTTPException, APIRouter, status
 from typing import List
 from bson import ObjectId
 from datetime import datetime
-from src.database import Vehicle
+from src.admission import admission_group
+from src.database import Vehicle, ReadVehicle, get_session
 from src.models import VehicleModel
+from src.profiling import ProfiledRoute
 from src.schemas import ErrorResponseMessage, VehicleRead
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get(
     "/vehicles",
     response_model=List[VehicleRead],
 )
+@admission_group("list")
 async def read_vehicles():
-    return await Vehicle.find().to_list(length=None)
+    return await ReadVehicle.find({}, session=get_session()).to_list(length=None)
 
 
 @router.get(
@@ -26,7 +29,9 @@ async def read_vehicles():
 )
 async def read_vehicle(vehicle_id: str):
     # Check the existing vehicle
-    vehicle = await Vehicle.find_one({"_id": ObjectId(vehicle_id)})
+    vehicle = await ReadVehicle.find_one(
+        {"_id": ObjectId(vehicle_id)}, session=get_session()
+    )
     if vehicle:
         return vehicle
     else:
@@ -49,7 +54,8 @@ async def add_vehicle(vehicle: VehicleModel):
                 {"registration_number": vehicle.registration_number},
                 {"driver_license_number": vehicle.driver_license_number},
             ]
-        }
+        },
+        session=get_session(),
     )
 
     if existing_vehicle_or_driver:
@@ -75,7 +81,7 @@ async def add_vehicle(vehicle: VehicleModel):
     vehicle_dict["updated_at"] = None
 
     try:
-        result = await Vehicle.insert_one(vehicle_dict)
+        result = await Vehicle.insert_one(vehicle_dict, session=get_session())
         vehicle_dict["_id"] = result.inserted_id  # Capture the MongoDB _id
     except Exception as e:
         raise HTTPException(status_code=400, detail="Error inserting vehicle!")
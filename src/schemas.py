@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from pydantic.functional_validators import BeforeValidator
-from typing import Optional, Annotated
+from typing import Optional, Annotated, List
 from datetime import datetime
 
 # It will be represented as a `str` on the model so that it can be serialized to JSON.
@@ -12,6 +12,16 @@ class ErrorResponseMessage(BaseModel):
     detail: str
 
 
+# Per-day conflicts reported by range allocations
+class AllocationConflict(BaseModel):
+    allocation_date: datetime
+    reason: str
+
+
+class AllocationConflictResponse(BaseModel):
+    detail: List[AllocationConflict] | str
+
+
 class MinimumEmployeeRead(BaseModel):
     name: str
     email: EmailStr
@@ -58,6 +68,7 @@ class AllocationRead(BaseModel):
     employee: MinimumEmployeeRead | None
     vehicle: MinimumVehicleRead | None
     allocation_date: datetime
+    version: int = 0
     created_at: datetime | None
     updated_at: datetime | None
 
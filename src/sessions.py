@@ -0,0 +1,89 @@
+import base64
+import bson
+from bson import Timestamp
+from starlette.datastructures import Headers, MutableHeaders
+from src.database import client, session_context
+
+# Carries the session's operation time between requests, as `<time>.<increment>`
+OPERATION_TIME_HEADER = "X-Mongo-Operation-Time"
+
+# Carries the session's signed `$clusterTime` document, as base64 encoded BSON.
+# Each uvicorn worker has its own client, so a request served by another worker
+# needs both times to read its own writes.
+CLUSTER_TIME_HEADER = "X-Mongo-Cluster-Time"
+
+
+def parse_operation_time(value: str | None) -> Timestamp | None:
+    if not value:
+        return None
+    try:
+        time, increment = value.split(".")
+        return Timestamp(int(time), int(increment))
+    except (TypeError, ValueError):
+        return None
+
+
+def format_operation_time(operation_time: Timestamp) -> str:
+    return f"{operation_time.time}.{operation_time.inc}"
+
+
+def parse_cluster_time(value: str | None) -> dict | None:
+    if not value:
+        return None
+    try:
+        cluster_time = bson.decode(base64.urlsafe_b64decode(value))
+    except (ValueError, bson.errors.BSONError):
+        return None
+    if not isinstance(cluster_time.get("clusterTime"), Timestamp):
+        return None
+    return cluster_time
+
+
+def format_cluster_time(cluster_time: dict) -> str:
+    return base64.urlsafe_b64encode(bson.encode(cluster_time)).decode()
+
+
+class CausalSessionMiddleware:
+    """
+    ASGI middleware running each API request in a causally consistent session.
+
+    A client that sends back the operation and cluster times of its last response
+    reads its own writes, even when the read is served by a secondary.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        async with await client.start_session(causal_consistency=True) as session:
+            headers = Headers(scope=scope)
+            cluster_time = parse_cluster_time(headers.get(CLUSTER_TIME_HEADER))
+            if cluster_time:
+                session.advance_cluster_time(cluster_time)
+            operation_time = parse_operation_time(headers.get(OPERATION_TIME_HEADER))
+            if operation_time:
+                session.advance_operation_time(operation_time)
+
+            async def send_with_session_times(message):
+                if message["type"] == "http.response.start":
+                    response_headers = MutableHeaders(scope=message)
+                    if session.operation_time is not None:
+                        response_headers.append(
+                            OPERATION_TIME_HEADER,
+                            format_operation_time(session.operation_time),
+                        )
+                    if session.cluster_time is not None:
+                        response_headers.append(
+                            CLUSTER_TIME_HEADER,
+                            format_cluster_time(session.cluster_time),
+                        )
+                await send(message)
+
+            token = session_context.set(session)
+            try:
+                await self.app(scope, receive, send_with_session_times)
+            finally:
+                session_context.reset(token)
@@ -12,27 +12,77 @@ def test_client():
 
 
 @pytest.fixture
-def allocation_data():
+def create_employee(test_client):
+    """Fixture to create employees that allocations can refer to."""
+
+    def _create_employee():
+        response = test_client.post(
+            "/api/employees",
+            json={"name": "Test Employee", "email": f"{ObjectId()}@example.com"},
+        )
+        assert response.status_code == 201
+        return response.json()["_id"]
+
+    return _create_employee
+
+
+@pytest.fixture
+def create_vehicle(test_client):
+    """Fixture to create vehicles that allocations can refer to."""
+
+    def _create_vehicle():
+        response = test_client.post(
+            "/api/vehicles",
+            json={
+                "name": "Test Vehicle",
+                "registration_number": str(ObjectId()),
+                "driver_name": "Test Driver",
+                "driver_license_number": str(ObjectId()),
+            },
+        )
+        assert response.status_code == 201
+        return response.json()["_id"]
+
+    return _create_vehicle
+
+
+@pytest.fixture
+def allocation_data(create_employee, create_vehicle):
     """Fixture to provide data for creating an allocation."""
     return {
-        "employee_id": str(ObjectId()),  # Generate a new ObjectId for employee_id
-        "vehicle_id": str(ObjectId()),  # Generate a new ObjectId for vehicle_id
+        "employee_id": create_employee(),
+        "vehicle_id": create_vehicle(),
         "allocation_date": datetime(2024, 12, 1).isoformat(),  # Set the allocation date
     }
 
 
 @pytest.fixture
-def future_allocation_data():
+def future_allocation_data(create_employee, create_vehicle):
     """Fixture to provide future allocation data for testing."""
     return {
-        "employee_id": str(ObjectId()),
-        "vehicle_id": str(ObjectId()),
+        "employee_id": create_employee(),
+        "vehicle_id": create_vehicle(),
         "allocation_date": (
             datetime.now().replace(hour=0, minute=0, second=0) + timedelta(days=1)
         ).isoformat(),  # Set to tomorrow
     }
 
 
+@pytest.fixture
+def future_range_allocation_data(create_employee, create_vehicle):
+    """Fixture to provide a future date-range allocation spanning three days."""
+    start_date = datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    return {
+        "employee_id": create_employee(),
+        "vehicle_id": create_vehicle(),
+        "start_date": start_date.isoformat(),
+        "end_date": (start_date + timedelta(days=2)).isoformat(),
+        "recurrence": "daily",
+    }
+
+
 @pytest.fixture
 def past_allocation_data():
     """Fixture to provide past allocation data for testing."""
@@ -60,10 +110,10 @@ def invalid_allocation_id():
 
 
 @pytest.fixture
-def updated_allocation_data():
+def updated_allocation_data(create_employee, create_vehicle):
     """Fixture to provide data for updating an existing allocation."""
     return {
-        "employee_id": str(ObjectId()),  # New employee_id for update
-        "vehicle_id": str(ObjectId()),  # New vehicle_id for update
+        "employee_id": create_employee(),  # New employee_id for update
+        "vehicle_id": create_vehicle(),  # New vehicle_id for update
         "allocation_date": datetime(2024, 12, 2).isoformat(),  # New allocation date
     }
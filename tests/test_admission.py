@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.admission import RouteLimiter, Saturated, classify, limiters
+from src.config import settings
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_queue_is_full():
+    """Test that a saturated limiter fails fast once its wait queue is full."""
+    limiter = RouteLimiter("test", max_concurrency=1, max_queue=0)
+    await limiter.acquire(timeout=0.1)
+
+    with pytest.raises(Saturated):
+        await limiter.acquire(timeout=0.1)
+    assert limiter.stats()["rejected"] == 1
+
+    limiter.release()
+    await limiter.acquire(timeout=0.1)
+    assert limiter.stats()["in_flight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_queue_timeout():
+    """Test that a queued request is rejected when no slot frees up in time."""
+    limiter = RouteLimiter("test", max_concurrency=1, max_queue=1)
+    await limiter.acquire(timeout=0.1)
+
+    with pytest.raises(Saturated):
+        await limiter.acquire(timeout=0.01)
+    assert limiter.stats()["queued"] == 0
+
+
+def test_classify_routes():
+    """Test that routes are split into read, list and write groups."""
+    assert classify(app.routes, "GET", "/") is None
+    assert classify(app.routes, "GET", "/api/allocations") == "list"
+    assert classify(app.routes, "GET", "/api/allocations/123") == "read"
+    assert classify(app.routes, "GET", "/api/allocations/by-date/2024-12-01") == "list"
+    assert classify(app.routes, "GET", "/api/employees") == "list"
+    assert classify(app.routes, "POST", "/api/allocations") == "write"
+
+
+@pytest.fixture
+def saturated_client(monkeypatch):
+    """Fixture to provide a client whose write limiter admits no requests."""
+    monkeypatch.setitem(limiters, "write", RouteLimiter("write", 0, 0))
+    # The lifespan is not run, so no request may reach the database
+    return TestClient(app)
+
+
+def test_saturated_route_returns_503(saturated_client):
+    """Test that a saturated route group fails fast with a 503 and `Retry-After`."""
+    response = saturated_client.post("/api/allocations", json={})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.admission_retry_after)
+    assert response.json() == {"detail": "Service is overloaded, try again later!"}
+
+
+def test_root_and_metrics_bypass_limiter(saturated_client, monkeypatch):
+    """Test that `/` and the admission metrics are served while routes are saturated."""
+    monkeypatch.setattr(settings, "metrics_token", None)
+    assert saturated_client.get("/").status_code == 200
+
+    response = saturated_client.get("/metrics/admission")
+    assert response.status_code == 200
+    assert response.json()["write"]["max_concurrency"] == 0
+
+
+def test_metrics_require_configured_token(saturated_client, monkeypatch):
+    """Test that metrics are only served with the configured token."""
+    monkeypatch.setattr(settings, "metrics_token", "secret")
+    assert saturated_client.get("/metrics/admission").status_code == 403
+
+    response = saturated_client.get(
+        "/metrics/admission", headers={"X-Metrics-Token": "secret"}
+    )
+    assert response.status_code == 200
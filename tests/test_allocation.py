@@ -1,4 +1,7 @@
 import pytest
+from bson import ObjectId
+from src.models import AllocationRangeModel
+from src.routers.allocation import expand_allocation_dates
 
 
 @pytest.mark.asyncio
@@ -16,6 +19,137 @@ async def test_create_allocation_with_past_date(test_client, past_allocation_dat
     assert response.json()["detail"] == "Allocation date must be in the future!"
 
 
+@pytest.mark.asyncio
+async def test_create_allocation_with_unknown_employee(
+    test_client, future_allocation_data
+):
+    """Test to create an allocation for an employee that does not exist."""
+    future_allocation_data["employee_id"] = str(ObjectId())
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Employee not found!"
+
+
+@pytest.mark.asyncio
+async def test_create_range_allocation(test_client, future_range_allocation_data):
+    """Test to create allocations for every day of a date range."""
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 201
+    assert len(response.json()) == 3
+
+
+def test_expand_allocation_dates_includes_end_day():
+    """Test that a range covers every calendar day up to and including its end date."""
+    allocation = AllocationRangeModel(
+        employee_id=str(ObjectId()),
+        vehicle_id=str(ObjectId()),
+        start_date="2026-11-01T09:00:00",
+        end_date="2026-11-05T00:00:00Z",
+    )
+    allocation_dates = expand_allocation_dates(allocation)
+    assert [allocation_date.day for allocation_date in allocation_dates] == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+    assert all(allocation_date.hour == 0 for allocation_date in allocation_dates)
+
+
+@pytest.mark.asyncio
+async def test_create_range_allocation_with_mixed_time_zones(
+    test_client, future_range_allocation_data
+):
+    """Test to create a range whose start and end dates mix time zone styles."""
+    future_range_allocation_data["start_date"] += "Z"
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 201
+    assert len(response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_create_range_allocation_conflicts_with_same_day_allocation(
+    test_client, future_range_allocation_data
+):
+    """Test that an allocation at another time of a day conflicts with a range."""
+    allocation_date = future_range_allocation_data["start_date"][:10] + "T09:30:00"
+    response = test_client.post(
+        "/api/allocations",
+        json={
+            "employee_id": future_range_allocation_data["employee_id"],
+            "vehicle_id": future_range_allocation_data["vehicle_id"],
+            "allocation_date": allocation_date,
+        },
+    )
+    assert response.status_code == 201
+
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 400
+    assert len(response.json()["detail"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_allocation_conflicts_with_same_day_range_allocation(
+    test_client, future_range_allocation_data, create_employee
+):
+    """Test that an allocation at another time of a day conflicts with an earlier range."""
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 201
+
+    # Another employee cannot book the vehicle at another time of a booked day
+    allocation_date = future_range_allocation_data["start_date"][:10] + "T09:30:00"
+    response = test_client.post(
+        "/api/allocations",
+        json={
+            "employee_id": create_employee(),
+            "vehicle_id": future_range_allocation_data["vehicle_id"],
+            "allocation_date": allocation_date,
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Vehicle is already allocated for a day!"
+
+
+@pytest.mark.asyncio
+async def test_create_allocation_is_stored_at_midnight(
+    test_client, future_allocation_data
+):
+    """Test that an allocation is stored at midnight of its day."""
+    allocation_date = future_allocation_data["allocation_date"][:10] + "T09:30:00"
+    response = test_client.post(
+        "/api/allocations",
+        json={**future_allocation_data, "allocation_date": allocation_date},
+    )
+    assert response.status_code == 201
+    assert response.json()["allocation_date"] == allocation_date[:10] + "T00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_create_range_allocation_with_conflicts(
+    test_client, future_range_allocation_data
+):
+    """Test that conflicts are reported for each day of an overlapping range."""
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 201
+
+    response = test_client.post(
+        "/api/allocations/range", json=future_range_allocation_data
+    )
+    assert response.status_code == 400
+    assert len(response.json()["detail"]) == 3
+
+
 @pytest.mark.asyncio
 async def test_read_allocations(test_client):
     """Test to read all allocations."""
@@ -33,6 +167,40 @@ async def test_read_allocation(test_client, valid_allocation_id):
     assert "vehicle" in response.json()
 
 
+@pytest.mark.asyncio
+async def test_read_own_write_with_operation_time(test_client, future_allocation_data):
+    """Test to read an allocation back using the operation time of its write."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    operation_time = response.headers.get("X-Mongo-Operation-Time")
+    cluster_time = response.headers.get("X-Mongo-Cluster-Time")
+    if operation_time is None or cluster_time is None:
+        pytest.skip("Causally consistent sessions require a replica set")
+
+    response = test_client.get(
+        f"/api/allocations/{response.json()['_id']}",
+        headers={
+            "X-Mongo-Operation-Time": operation_time,
+            "X-Mongo-Cluster-Time": cluster_time,
+            "Cache-Control": "no-cache",
+        },
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_read_allocations_by_date(test_client, future_allocation_data):
+    """Test to read the roster of allocations for a date."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+
+    allocation_date = future_allocation_data["allocation_date"][:10]
+    response = test_client.get(f"/api/allocations/by-date/{allocation_date}")
+    assert response.status_code == 200
+    assert allocation_id in [allocation["_id"] for allocation in response.json()]
+
+
 @pytest.mark.asyncio
 async def test_update_allocation(
     test_client, valid_allocation_id, updated_allocation_data
@@ -47,6 +215,63 @@ async def test_update_allocation(
     )
 
 
+@pytest.mark.asyncio
+async def test_update_allocation_with_if_match(test_client, future_allocation_data):
+    """Test to update an allocation only while its version is unchanged."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+    etag = response.headers["ETag"]
+
+    response = test_client.put(
+        f"/api/allocations/{allocation_id}",
+        json=future_allocation_data,
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+
+    # A second update with the stale version must not overwrite the first one
+    response = test_client.put(
+        f"/api/allocations/{allocation_id}",
+        json=future_allocation_data,
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_update_allocation_with_if_match_from_read(
+    test_client, future_allocation_data
+):
+    """Test to update an allocation using the ETag of a read of it."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+
+    response = test_client.get(f"/api/allocations/{allocation_id}")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"1"'
+
+    response = test_client.put(
+        f"/api/allocations/{allocation_id}",
+        json=future_allocation_data,
+        headers={"If-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 200
+
+    # A read right after the update returns the new version
+    response = test_client.get(f"/api/allocations/{allocation_id}")
+    assert response.headers["ETag"] == '"2"'
+    response = test_client.put(
+        f"/api/allocations/{allocation_id}",
+        json=future_allocation_data,
+        headers={"If-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 200
+
+
 @pytest.mark.asyncio
 async def test_delete_allocation_with_unfinished_future_date(
     test_client, valid_allocation_id
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from redis.exceptions import ConnectionError, TimeoutError
+from src.pools import MonitoredBlockingConnectionPool, PoolStats
+
+
+def test_pool_stats_track_checkouts():
+    """Test that checkouts, connections in use and wait times are recorded."""
+    pool = PoolStats()
+    pool.checked_out(0.002)
+    pool.checked_out(0.004)
+    pool.checked_in()
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 1
+    assert stats["max_in_use"] == 2
+    assert stats["max_wait_ms"] == pytest.approx(4)
+
+
+@pytest.mark.asyncio
+async def test_redis_pool_records_exhaustion():
+    """Test that a Redis checkout timing out on a full pool counts as exhaustion."""
+    pool = MonitoredBlockingConnectionPool(max_connections=1, timeout=0.01)
+    # Hold the only connection of the pool without connecting it
+    pool._in_use_connections.add(pool.make_connection())
+
+    with pytest.raises(ConnectionError):
+        await pool.get_connection("PING")
+    assert pool.stats()["exhausted"] == 1
+
+
+@asynccontextmanager
+async def redis_server(reply: bool = True):
+    """Run a server answering every Redis command with OK, or never."""
+
+    async def handle(reader, writer):
+        while data := await reader.read(1024):
+            if reply:
+                # Pipelined commands arrive together, each starts with an array header
+                commands = (b"\r\n" + data).count(b"\r\n*")
+                writer.write(b"+OK\r\n" * commands)
+                await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        yield f"redis://127.0.0.1:{port}"
+    finally:
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_pool_counts_opened_and_closed_connections():
+    """Test that the sockets opened and closed by Redis connections are counted."""
+    async with redis_server() as url:
+        pool = MonitoredBlockingConnectionPool.from_url(url, max_connections=1)
+        connection = await pool.get_connection("PING")
+        await pool.release(connection)
+        await pool.disconnect()
+
+    stats = pool.stats()
+    assert stats["connections_created"] == 1
+    assert stats["connections_closed"] == 1
+    assert stats["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_pool_records_connection_timeout():
+    """Test that a Redis checkout failing with a timeout counts as a failure."""
+    async with redis_server(reply=False) as url:
+        pool = MonitoredBlockingConnectionPool.from_url(
+            url, max_connections=1, socket_timeout=0.05
+        )
+        with pytest.raises(TimeoutError):
+            await pool.get_connection("PING")
+        await pool.disconnect()
+
+    stats = pool.stats()
+    assert stats["checkout_failures"] == 1
+    assert stats["exhausted"] == 0
+    assert stats["in_use"] == 0
@@ -0,0 +1,68 @@
+import json
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from src.profiling import ProfiledRoute, ProfilingMiddleware
+
+
+@pytest.fixture
+def profiled_client(tmp_path):
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"item_id": item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=0.0,
+        header="X-Profile",
+        token="secret",
+        output_dir=tmp_path,
+        max_files=2,
+    )
+    return TestClient(app)
+
+
+def test_profile_requested_by_header(profiled_client, tmp_path):
+    """Test that a request with the profiling header is profiled and written to disk."""
+    response = profiled_client.get("/items/1", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+
+    server_timing = response.headers["Server-Timing"]
+    for phase in ("validation", "endpoint", "serialization", "total"):
+        assert f"{phase};dur=" in server_timing
+
+    (profile_file,) = tmp_path.iterdir()
+    trace = json.loads(profile_file.read_text())
+    assert {event["cat"] for event in trace["traceEvents"]} >= {"validation", "total"}
+
+
+def test_request_not_profiled_without_header(profiled_client, tmp_path):
+    """Test that requests are not profiled unless asked for or sampled."""
+    response = profiled_client.get("/items/1")
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("value", ["1", "0", "wrong"])
+def test_request_not_profiled_without_token(profiled_client, tmp_path, value):
+    """Test that the profiling header is ignored unless it carries the token."""
+    response = profiled_client.get("/items/1", headers={"X-Profile": value})
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oldest_profiles_are_pruned(profiled_client, tmp_path):
+    """Test that only the newest profiles are kept in the output directory."""
+    (tmp_path / "0-old.json").write_text("{}")
+    for _ in range(3):
+        profiled_client.get("/items/1", headers={"X-Profile": "secret"})
+
+    profiles = sorted(path.name for path in tmp_path.iterdir())
+    assert len(profiles) == 2
+    assert "0-old.json" not in profiles
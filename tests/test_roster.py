@@ -0,0 +1,136 @@
+import pytest
+from datetime import date, datetime, timedelta
+from src.cache import redis
+from src.roster import (
+    ROSTER_BUILT_KEY,
+    ROSTER_INDEX_KEY,
+    ROSTER_INDEX_RETENTION_DAYS,
+    add_to_roster,
+    rebuild_roster,
+    remove_from_roster,
+    roster_key,
+)
+from src.schemas import AllocationRead
+
+
+@pytest.fixture
+def built_roster(test_client):
+    """Fixture to build the roster, so the by-date view is served from Redis."""
+    test_client.portal.call(rebuild_roster)
+    assert test_client.portal.call(redis.exists, ROSTER_BUILT_KEY)
+
+
+def read_roster_ids(test_client, allocation_date: str) -> list:
+    response = test_client.get(f"/api/allocations/by-date/{allocation_date}")
+    assert response.status_code == 200
+    return [allocation["_id"] for allocation in response.json()]
+
+
+@pytest.mark.asyncio
+async def test_read_by_date_is_served_from_roster(
+    test_client, built_roster, future_allocation_data
+):
+    """Test that the by-date view is served from Redis once the roster is built."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+    allocation_date = future_allocation_data["allocation_date"][:10]
+    assert allocation_id in read_roster_ids(test_client, allocation_date)
+
+    # An entry missing from Redis is missing from the view, although it is in Mongo
+    key = roster_key(date.fromisoformat(allocation_date))
+    test_client.portal.call(redis.hdel, key, allocation_id)
+    assert allocation_id not in read_roster_ids(test_client, allocation_date)
+
+
+@pytest.mark.asyncio
+async def test_update_moves_allocation_in_roster(
+    test_client, built_roster, future_allocation_data
+):
+    """Test that an update moves the roster entry to its new day."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+
+    previous_date = future_allocation_data["allocation_date"][:10]
+    new_date = (date.fromisoformat(previous_date) + timedelta(days=1)).isoformat()
+    response = test_client.put(
+        f"/api/allocations/{allocation_id}",
+        json={**future_allocation_data, "allocation_date": new_date},
+    )
+    assert response.status_code == 200
+
+    assert allocation_id not in read_roster_ids(test_client, previous_date)
+    assert allocation_id in read_roster_ids(test_client, new_date)
+    index_entry = test_client.portal.call(redis.hget, ROSTER_INDEX_KEY, allocation_id)
+    assert index_entry.decode() == f"2|{roster_key(date.fromisoformat(new_date))}"
+
+
+@pytest.mark.asyncio
+async def test_stale_roster_write_is_ignored(
+    test_client, built_roster, future_allocation_data
+):
+    """Test that a delayed write of an older version does not overwrite the roster."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    created_allocation = AllocationRead(**response.json())
+
+    previous_date = future_allocation_data["allocation_date"][:10]
+    new_date = (date.fromisoformat(previous_date) + timedelta(days=1)).isoformat()
+    response = test_client.put(
+        f"/api/allocations/{created_allocation.id}",
+        json={**future_allocation_data, "allocation_date": new_date},
+    )
+    assert response.status_code == 200
+
+    test_client.portal.call(add_to_roster, [created_allocation])
+    assert created_allocation.id not in read_roster_ids(test_client, previous_date)
+    response = test_client.get(f"/api/allocations/by-date/{new_date}")
+    (allocation,) = [
+        allocation
+        for allocation in response.json()
+        if allocation["_id"] == created_allocation.id
+    ]
+    assert allocation["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_removed_allocation_leaves_tombstone(
+    test_client, built_roster, future_allocation_data
+):
+    """Test that a removed allocation cannot be written back by a delayed write."""
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    created_allocation = AllocationRead(**response.json())
+    allocation_date = future_allocation_data["allocation_date"][:10]
+
+    test_client.portal.call(
+        remove_from_roster,
+        created_allocation.id,
+        datetime.fromisoformat(allocation_date),
+    )
+    assert created_allocation.id not in read_roster_ids(test_client, allocation_date)
+    index_entry = test_client.portal.call(
+        redis.hget, ROSTER_INDEX_KEY, created_allocation.id
+    )
+    key = roster_key(date.fromisoformat(allocation_date))
+    assert index_entry.decode() == f"deleted|{key}"
+
+    test_client.portal.call(add_to_roster, [created_allocation])
+    assert created_allocation.id not in read_roster_ids(test_client, allocation_date)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_prunes_index_of_past_days(test_client, future_allocation_data):
+    """Test that index entries of past days are pruned, while recent ones are kept."""
+    past_date = datetime.now() - timedelta(days=ROSTER_INDEX_RETENTION_DAYS + 1)
+    test_client.portal.call(remove_from_roster, "past-allocation", past_date)
+    response = test_client.post("/api/allocations", json=future_allocation_data)
+    assert response.status_code == 201
+    allocation_id = response.json()["_id"]
+
+    test_client.portal.call(rebuild_roster)
+    assert not test_client.portal.call(
+        redis.hexists, ROSTER_INDEX_KEY, "past-allocation"
+    )
+    assert test_client.portal.call(redis.hexists, ROSTER_INDEX_KEY, allocation_id)
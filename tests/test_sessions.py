@@ -0,0 +1,65 @@
+import pytest
+from bson import Int64, Timestamp
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.database import get_session
+from src.sessions import (
+    CLUSTER_TIME_HEADER,
+    OPERATION_TIME_HEADER,
+    CausalSessionMiddleware,
+    format_cluster_time,
+    format_operation_time,
+    parse_cluster_time,
+    parse_operation_time,
+)
+
+CLUSTER_TIME = {
+    "clusterTime": Timestamp(1700000000, 7),
+    "signature": {"hash": b"\x00" * 20, "keyId": Int64(0)},
+}
+
+
+@pytest.fixture
+def session_client():
+    """Fixture to provide a client for an app reporting its request session."""
+    app = FastAPI()
+    app.add_middleware(CausalSessionMiddleware)
+
+    @app.get("/api/session")
+    async def read_session():
+        session = get_session()
+        return {
+            "operation_time": format_operation_time(session.operation_time),
+            "cluster_time": session.cluster_time["clusterTime"].time,
+        }
+
+    return TestClient(app)
+
+
+def test_session_times_round_trip():
+    """Test that operation and cluster times survive their header encoding."""
+    operation_time = Timestamp(1700000000, 3)
+    assert parse_operation_time(format_operation_time(operation_time)) == (
+        operation_time
+    )
+    assert parse_cluster_time(format_cluster_time(CLUSTER_TIME)) == CLUSTER_TIME
+    assert parse_cluster_time("not-bson") is None
+
+
+def test_session_advanced_from_headers(session_client):
+    """Test that a request's session is advanced to the times its client has seen."""
+    response = session_client.get(
+        "/api/session",
+        headers={
+            OPERATION_TIME_HEADER: "1700000000.3",
+            CLUSTER_TIME_HEADER: format_cluster_time(CLUSTER_TIME),
+        },
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "operation_time": "1700000000.3",
+        "cluster_time": 1700000000,
+    }
+    # Both times are handed back so the next request, on any worker, can use them
+    assert response.headers[OPERATION_TIME_HEADER] == "1700000000.3"
+    assert parse_cluster_time(response.headers[CLUSTER_TIME_HEADER]) == CLUSTER_TIME